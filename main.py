@@ -1,21 +1,37 @@
 from fastapi import FastAPI, HTTPException, Request, Depends, Form
 from fastapi.responses import RedirectResponse, HTMLResponse
 from fastapi.templating import Jinja2Templates
-from sqlalchemy.orm import Session
-from sqlalchemy import func
+from sqlalchemy.orm import joinedload
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import func, distinct, select, text
+from jinja2 import FileSystemBytecodeCache
 from datetime import datetime, timezone
 from typing import Optional
+import asyncio
+import cachetools
+import os
 import uvicorn
 
-from database import engine, get_db, Base
-from models import URL, Click
-from utils import encode_id, validate_url, validate_custom_slug, parse_user_agent
+from database import engine, get_db, Base, SessionLocal
+from models import URL, Click, Browser, OperatingSystem, DeviceType
+from utils import (
+    encode_id,
+    validate_url,
+    validate_custom_slug,
+    parse_user_agent,
+    get_or_create_dimension_id,
+)
 
 # Reserved slugs that cannot be used as custom slugs
 RESERVED_SLUGS = {"stats", "shorten", "admin", "login", "logout"}
 
-# Create database tables
-Base.metadata.create_all(bind=engine)
+# In-process cache of slug -> (url_id, long_url, expires_at) so hot redirects
+# skip the database entirely; expiry is re-checked in Python on every hit
+SLUG_CACHE = cachetools.LRUCache(maxsize=10000)
+
+# Redirects only need three columns, so skip ORM hydration entirely on cache
+# misses; SQLAlchemy caches the compiled statement, SQLite the prepared one
+SELECT_BY_SLUG = text("SELECT id, long_url, expires_at FROM urls WHERE slug = :slug")
 
 # Initialize FastAPI app
 app = FastAPI(
@@ -24,8 +40,91 @@ app = FastAPI(
     version="1.0.0"
 )
 
-# Set up Jinja2 templates
+# Set up Jinja2 templates. Compiled template bytecode is cached on disk so
+# other worker processes (and restarts) skip recompilation, and auto_reload
+# is off so renders don't stat the template file every time
+os.makedirs(".jinja_cache", exist_ok=True)
 templates = Jinja2Templates(directory="templates")
+templates.env.bytecode_cache = FileSystemBytecodeCache(directory=".jinja_cache")
+templates.env.auto_reload = False
+
+# Click inserts are batched off the redirect path: redirects enqueue a dict
+# and the background writer flushes up to CLICK_BATCH_SIZE rows at a time,
+# or whatever has arrived within CLICK_FLUSH_INTERVAL seconds
+CLICK_BATCH_SIZE = 500
+CLICK_FLUSH_INTERVAL = 0.1
+
+async def _flush_clicks(batch):
+    """
+    Insert a batch of click dicts in one executemany statement.
+
+    Redirects enqueue the raw browser/OS strings; they are interned into the
+    dimension tables here, off the hot path (and almost always served from
+    the get_or_create cache).
+    """
+    if not batch:
+        return
+    try:
+        async with SessionLocal() as db:
+            for click in batch:
+                click["browser_id"] = await get_or_create_dimension_id(
+                    db, Browser, click.pop("browser")
+                )
+                click["os_id"] = await get_or_create_dimension_id(
+                    db, OperatingSystem, click.pop("os")
+                )
+            await db.execute(Click.__table__.insert(), batch)
+            await db.commit()
+    except Exception as e:
+        # Analytics must never take the app down
+        print(f"Error flushing click batch: {str(e)}")
+
+async def click_writer():
+    """Background task that drains the click queue and batch-inserts"""
+    queue = app.state.click_q
+    while True:
+        # Block until at least one click arrives
+        batch = [await queue.get()]
+
+        # Collect more clicks until the batch is full or the interval passes
+        deadline = asyncio.get_event_loop().time() + CLICK_FLUSH_INTERVAL
+        while len(batch) < CLICK_BATCH_SIZE:
+            timeout = deadline - asyncio.get_event_loop().time()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(queue.get(), timeout))
+            except asyncio.TimeoutError:
+                break
+
+        await _flush_clicks(batch)
+
+@app.on_event("startup")
+async def startup():
+    # Create database tables
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+
+    app.state.click_q = asyncio.Queue()
+    app.state.click_writer_task = asyncio.create_task(click_writer())
+
+@app.on_event("shutdown")
+async def stop_click_writer():
+    app.state.click_writer_task.cancel()
+    try:
+        await app.state.click_writer_task
+    except asyncio.CancelledError:
+        pass
+
+    # Flush anything still queued so no clicks are lost
+    queue = app.state.click_q
+    batch = []
+    while not queue.empty():
+        batch.append(queue.get_nowait())
+    await _flush_clicks(batch)
+
+    # Close pooled connections (their worker threads keep the process alive)
+    await engine.dispose()
 
 @app.get("/", response_class=HTMLResponse, name="home")
 async def home(request: Request):
@@ -39,7 +138,7 @@ async def create_short_url(
     request: Request,
     long_url: str = Form(...),
     custom_slug: Optional[str] = Form(None),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """
     Create a new short URL
@@ -77,9 +176,12 @@ async def create_short_url(
                 detail="Invalid slug. Use 3-50 alphanumeric characters, hyphens, or underscores."
             )
         
-        # Check if custom slug already exists
-        existing = db.query(URL).filter(URL.slug == custom_slug).first()
-        if existing:
+        # Check if custom slug already exists; selecting just the id makes
+        # this a pure index lookup with no ORM object hydration
+        taken = (await db.execute(
+            select(URL.id).where(URL.slug == custom_slug)
+        )).scalar() is not None
+        if taken:
             raise HTTPException(
                 status_code=400,
                 detail=f"Slug '{custom_slug}' is already taken. Please choose another."
@@ -88,50 +190,61 @@ async def create_short_url(
         # Create URL with custom slug
         new_url = URL(slug=custom_slug, long_url=long_url)
         db.add(new_url)
-        
+
         try:
-            db.commit()
-            db.refresh(new_url)
+            await db.commit()
         except Exception as e:
-            db.rollback()
+            await db.rollback()
             print(f"Error creating short URL with custom slug: {str(e)}")
             raise HTTPException(status_code=500, detail=f"Failed to create short URL: {str(e)}")
-        
+
+        slug = custom_slug
+
     else:
-        # Create URL with auto-generated slug
-        new_url = URL(long_url=long_url, slug="temp")
-        db.add(new_url)
-        
+        # Create URL with auto-generated slug. The slug is derived from the
+        # auto-increment id, so INSERT ... RETURNING id and the slug fix-up
+        # run inside one write transaction: the INSERT takes the write lock
+        # up front (no read-to-write upgrade for a concurrent writer to
+        # break), and the placeholder slug is never visible to readers.
         try:
-            db.flush()  # Get the auto-increment ID
-            
-            # Generate slug from ID
-            slug = encode_id(new_url.id)
-            new_url.slug = slug
-            
-            db.commit()
-            db.refresh(new_url)
+            url_table = URL.__table__
+            new_id = (await db.execute(
+                url_table.insert()
+                .values(long_url=long_url, slug="temp")
+                .returning(url_table.c.id)
+            )).scalar_one()
+
+            slug = encode_id(new_id)
+            await db.execute(
+                url_table.update().where(url_table.c.id == new_id).values(slug=slug)
+            )
+
+            await db.commit()
         except Exception as e:
-            db.rollback()
+            await db.rollback()
             print(f"Error creating short URL with auto-generated slug: {str(e)}")
             raise HTTPException(status_code=500, detail=f"Failed to create short URL: {str(e)}")
-    
+
+    # Drop any stale cache entry for this slug (normally a no-op, but keeps
+    # the cache consistent if the slug was ever looked up before)
+    SLUG_CACHE.pop(slug, None)
+
     # Build full short URL properly
     # Use base_url which handles proxy headers correctly
     base_url = str(request.base_url).rstrip('/')
-    short_url = f"{base_url}/{new_url.slug}"
-    
+    short_url = f"{base_url}/{slug}"
+
     return {
         "short_url": short_url,
-        "slug": new_url.slug,
-        "long_url": new_url.long_url
+        "slug": slug,
+        "long_url": long_url
     }
 
 @app.get("/{slug}")
 async def redirect_to_long_url(
     slug: str,
     request: Request,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """
     Redirect short URL to original URL and track analytics
@@ -144,47 +257,64 @@ async def redirect_to_long_url(
     Returns:
         Redirect to the original long URL
     """
-    # Look up URL
-    url = db.query(URL).filter(URL.slug == slug).first()
-    
-    if not url:
-        raise HTTPException(status_code=404, detail="URL not found")
-    
-    # Check expiration
-    if url.expires_at:
-        expires_at_aware = url.expires_at.replace(tzinfo=timezone.utc) if url.expires_at.tzinfo is None else url.expires_at
+    # Look up URL, hitting the in-process cache first; misses run a raw
+    # three-column SELECT with no ORM object construction
+    cached = SLUG_CACHE.get(slug)
+    if cached is None:
+        row = (await db.execute(SELECT_BY_SLUG, {"slug": slug})).first()
+
+        if row is None:
+            raise HTTPException(status_code=404, detail="URL not found")
+
+        url_id, long_url, expires_at = row
+
+        # The raw statement bypasses type converters, so SQLite hands
+        # expires_at back as the stored ISO string
+        if isinstance(expires_at, str):
+            expires_at = datetime.fromisoformat(expires_at)
+
+        cached = (url_id, long_url, expires_at)
+        SLUG_CACHE[slug] = cached
+
+    url_id, long_url, expires_at = cached
+
+    # Check expiration (in Python, so cached entries expire too)
+    if expires_at:
+        expires_at_aware = expires_at.replace(tzinfo=timezone.utc) if expires_at.tzinfo is None else expires_at
         if datetime.now(timezone.utc) > expires_at_aware:
             raise HTTPException(status_code=410, detail="This URL has expired")
     
-    # Parse user agent
-    user_agent_string = request.headers.get("user-agent")
-    device_info = parse_user_agent(user_agent_string)
-    
-    # Track click analytics
+    # Track click analytics: enqueue for the background writer so the
+    # redirect never waits on a database write; the raw browser/OS strings
+    # are resolved to dimension ids by the writer
     try:
-        click = Click(
-            url_id=url.id,
-            referrer=request.headers.get("referer"),
-            user_agent=user_agent_string,
-            ip_address=request.client.host if request.client else None,
-            device_type=device_info["device_type"],
-            browser=device_info["browser"],
-            os=device_info["os"]
-        )
-        db.add(click)
-        db.commit()
+        user_agent_string = request.headers.get("user-agent")
+        device_info = parse_user_agent(user_agent_string)
+
+        now = datetime.now(timezone.utc)
+        app.state.click_q.put_nowait({
+            "url_id": url_id,
+            "timestamp": now,
+            "date": now.date(),
+            "referrer": request.headers.get("referer"),
+            "user_agent": user_agent_string,
+            "ip_address": request.client.host if request.client else None,
+            "device_type": int(DeviceType[device_info["device_type"].upper()]),
+            "browser": device_info["browser"],
+            "os": device_info["os"]
+        })
     except Exception:
         # Don't fail redirect if analytics tracking fails
-        db.rollback()
+        pass
     
     # Redirect to long URL
-    return RedirectResponse(url=url.long_url, status_code=302)
+    return RedirectResponse(url=long_url, status_code=302)
 
 @app.get("/stats/{slug}", response_class=HTMLResponse)
 async def get_stats(
     slug: str,
     request: Request,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """
     View analytics for a short URL
@@ -197,53 +327,70 @@ async def get_stats(
     Returns:
         HTML page with analytics dashboard
     """
-    url = db.query(URL).filter(URL.slug == slug).first()
-    
+    url = (await db.execute(select(URL).where(URL.slug == slug))).scalars().first()
+
     if not url:
         raise HTTPException(status_code=404, detail="URL not found")
-    
-    # Get click statistics
-    clicks = url.clicks
-    
-    # Calculate unique IPs
-    unique_ips = len(set(click.ip_address for click in clicks if click.ip_address))
-    
-    # Get click count efficiently
-    click_count = db.query(func.count(Click.id)).filter(Click.url_id == url.id).scalar()
-    
+
+    # Total clicks and unique IPs come from one pass over the clicks index
+    # (COUNT DISTINCT skips NULLs for us)
+    click_count, unique_ips = (await db.execute(
+        select(func.count(Click.id), func.count(distinct(Click.ip_address)))
+        .where(Click.url_id == url.id)
+    )).one()
+
     # Calculate average clicks per day
     created_at_aware = url.created_at.replace(tzinfo=timezone.utc) if url.created_at.tzinfo is None else url.created_at
     days_since_creation = (datetime.now(timezone.utc) - created_at_aware).days or 1
     avg_clicks_per_day = round(click_count / days_since_creation, 1)
-    
-    # Group clicks by date for chart
-    clicks_by_date = {}
-    for click in clicks:
-        date_key = click.timestamp.strftime('%Y-%m-%d')
-        clicks_by_date[date_key] = clicks_by_date.get(date_key, 0) + 1
-    
-    # Group by device type
-    clicks_by_device = {}
-    for click in clicks:
-        device = click.device_type or "unknown"
-        clicks_by_device[device] = clicks_by_device.get(device, 0) + 1
-    
-    # Group by referrer
+
+    # Group clicks by date for chart; the date column is populated at insert
+    # time, so this is a plain GROUP BY with no per-row date derivation
+    clicks_by_date = {
+        date.isoformat(): count
+        for date, count in (await db.execute(
+            select(Click.date, func.count())
+            .where(Click.url_id == url.id)
+            .group_by(Click.date)
+        )).all()
+    }
+
+    # Group by device type (stored as DeviceType ints; label for the chart)
+    clicks_by_device = {
+        DeviceType(device_type).label: count
+        for device_type, count in (await db.execute(
+            select(Click.device_type, func.count())
+            .where(Click.url_id == url.id)
+            .group_by(Click.device_type)
+        )).all()
+    }
+
+    # Group by referrer; rows arrive pre-aggregated, so shortening long
+    # referrers only touches one entry per distinct referrer
     clicks_by_referrer = {}
-    for click in clicks:
-        referrer = click.referrer or "Direct"
-        # Shorten long referrers
+    for referrer, count in (await db.execute(
+        select(func.coalesce(Click.referrer, "Direct"), func.count())
+        .where(Click.url_id == url.id)
+        .group_by(Click.referrer)
+    )).all():
         if len(referrer) > 50:
             referrer = referrer[:47] + "..."
-        clicks_by_referrer[referrer] = clicks_by_referrer.get(referrer, 0) + 1
-    
-    # Get recent clicks (last 20, most recent first)
-    recent_clicks = list(reversed(clicks[-20:]))
-    
+        clicks_by_referrer[referrer] = clicks_by_referrer.get(referrer, 0) + count
+
+    # Get recent clicks (last 20, most recent first), with the browser/OS
+    # dimension rows joined in so the template does not lazy-load per row
+    recent_clicks = (await db.execute(
+        select(Click)
+        .options(joinedload(Click.browser), joinedload(Click.os))
+        .where(Click.url_id == url.id)
+        .order_by(Click.timestamp.desc())
+        .limit(20)
+    )).scalars().all()
+
     return templates.TemplateResponse("stats.html", {
         "request": request,
         "url": url,
-        "clicks": clicks,
+        "click_count": click_count,
         "recent_clicks": recent_clicks,
         "unique_ips": unique_ips,
         "days_since_creation": days_since_creation,
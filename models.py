@@ -1,8 +1,36 @@
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey
+from sqlalchemy import Column, Integer, SmallInteger, String, Date, DateTime, ForeignKey, Index
 from sqlalchemy.orm import relationship
 from datetime import datetime, timezone
+from enum import IntEnum
 from database import Base
 
+class DeviceType(IntEnum):
+    """Device categories, stored as small integers on Click rows"""
+    UNKNOWN = 0
+    MOBILE = 1
+    DESKTOP = 2
+    TABLET = 3
+    BOT = 4
+
+    @property
+    def label(self) -> str:
+        """Lowercase name as shown in the stats UI (e.g. 'mobile')"""
+        return self.name.lower()
+
+class Browser(Base):
+    """Dimension table interning distinct browser name/version strings"""
+    __tablename__ = "browsers"
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    name = Column(String, unique=True, nullable=False)
+
+class OperatingSystem(Base):
+    """Dimension table interning distinct OS name/version strings"""
+    __tablename__ = "operating_systems"
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    name = Column(String, unique=True, nullable=False)
+
 class URL(Base):
     """URL model for storing long URLs and their short slugs"""
     __tablename__ = "urls"
@@ -13,21 +41,37 @@ class URL(Base):
     created_at = Column(DateTime, default=lambda: datetime.now(timezone.utc))
     expires_at = Column(DateTime, nullable=True)
     
-    # Relationship with clicks (use selectinload in queries for better performance)
-    clicks = relationship("Click", back_populates="url", cascade="all, delete-orphan")
-    
-    @property
-    def click_count(self):
-        """Get total number of clicks"""
-        return len(self.clicks)
+    # Relationship with clicks. lazy="noload" so an accidental read comes
+    # back empty instead of silently materializing every click row; any real
+    # need goes through an aggregated or LIMITed query on Click (see
+    # get_stats). passive_deletes lets the FK cascade handle row cleanup
+    # without loading children first.
+    clicks = relationship(
+        "Click",
+        back_populates="url",
+        cascade="all, delete-orphan",
+        lazy="noload",
+        passive_deletes=True
+    )
 
 class Click(Base):
     """Click model for tracking analytics"""
     __tablename__ = "clicks"
-    
+
+    # Stats queries filter on url_id and order by timestamp; the composite
+    # index serves both as one range scan with no separate sort step, and
+    # makes standalone indexes on either column redundant
+    __table_args__ = (
+        Index("ix_clicks_url_id_ts", "url_id", "timestamp"),
+    )
+
     id = Column(Integer, primary_key=True, index=True)
-    url_id = Column(Integer, ForeignKey("urls.id"), nullable=False, index=True)
-    timestamp = Column(DateTime, default=lambda: datetime.now(timezone.utc), index=True)
+    url_id = Column(Integer, ForeignKey("urls.id", ondelete="CASCADE"), nullable=False)
+    timestamp = Column(DateTime, default=lambda: datetime.now(timezone.utc))
+
+    # Day bucket, set at insert time so the stats chart can GROUP BY a plain
+    # column instead of re-deriving the date from every timestamp
+    date = Column(Date, index=True, default=lambda: datetime.now(timezone.utc).date())
     
     # Request metadata
     referrer = Column(String, nullable=True)
@@ -38,10 +82,22 @@ class Click(Base):
     country = Column(String, nullable=True)
     city = Column(String, nullable=True)
     
-    # Device information (parsed from user agent)
-    device_type = Column(String, nullable=True)  # mobile, desktop, tablet
-    browser = Column(String, nullable=True)
-    os = Column(String, nullable=True)
-    
+    # Device information (parsed from user agent). These are low-cardinality
+    # values repeated on every row, so they are stored as a DeviceType int
+    # and foreign keys into the browser/OS dimension tables rather than as
+    # text, keeping click rows small and GROUP BYs cheap
+    device_type = Column(SmallInteger, nullable=False, default=int(DeviceType.UNKNOWN))
+    browser_id = Column(Integer, ForeignKey("browsers.id"), nullable=True)
+    os_id = Column(Integer, ForeignKey("operating_systems.id"), nullable=True)
+
     # Relationship with URL
     url = relationship("URL", back_populates="clicks")
+
+    # Dimension lookups (tiny tables; eager-load when listing many clicks)
+    browser = relationship("Browser")
+    os = relationship("OperatingSystem")
+
+    @property
+    def device_label(self) -> str:
+        """Human-readable device type for templates (e.g. 'mobile')"""
+        return DeviceType(self.device_type or 0).label
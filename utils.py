@@ -1,39 +1,68 @@
+import functools
+import re
 import string
 from typing import Optional
+from sqlalchemy import select
+from sqlalchemy.exc import IntegrityError
 from user_agents import parse
 
 # Base62 alphabet: 0-9, a-z, A-Z
 BASE62 = string.digits + string.ascii_lowercase + string.ascii_uppercase
 
+# Bytes version for encode_id: indexing bytes yields the code point directly
+_BASE62_BYTES = BASE62.encode("ascii")
+
+# 62**6: ids below this fit in the default six digits
+_62_POW_6 = 56800235584
+
+def _encode6(n: int) -> str:
+    """
+    Unrolled base62 encoder for the common case: n < 62**6 with the default
+    six-character width. Divisors are precomputed powers of 62, so there is
+    no loop, no buffer, and no termination test.
+    """
+    return (
+        BASE62[(n // 916132832) % 62]  # 62**5
+        + BASE62[(n // 14776336) % 62]  # 62**4
+        + BASE62[(n // 238328) % 62]    # 62**3
+        + BASE62[(n // 3844) % 62]      # 62**2
+        + BASE62[(n // 62) % 62]
+        + BASE62[n % 62]
+    )
+
 def encode_id(num: int, min_length: int = 6) -> str:
     """
     Convert a number to a base62 string, padded to minimum length.
-    
+
     Args:
         num: Integer ID to encode
         min_length: Minimum length of the output string (default: 6)
-        
+
     Returns:
         Base62 encoded string, padded with leading zeros to min_length
-        
+
     Note:
         With 6 characters and base62, you can encode up to 56.8 billion URLs
     """
-    if num == 0:
-        return BASE62[0].zfill(min_length)
-    
-    result = []
+    # Nearly every id fits the default width; take the unrolled path
+    if min_length == 6 and 0 <= num < _62_POW_6:
+        return _encode6(num)
+
+    # Fill a pre-padded buffer right-to-left; digits land in their final
+    # position, so there is no list, reversed() pass, or padding concat
+    buf = bytearray(b"0" * min_length)
+    i = min_length - 1
+
     while num:
-        result.append(BASE62[num % 62])
-        num //= 62
-    
-    encoded = ''.join(reversed(result))
-    
-    # Pad with leading zeros to meet minimum length
-    if len(encoded) < min_length:
-        encoded = BASE62[0] * (min_length - len(encoded)) + encoded
-    
-    return encoded
+        num, rem = divmod(num, 62)
+        if i < 0:
+            # Number needs more digits than min_length
+            buf.insert(0, _BASE62_BYTES[rem])
+        else:
+            buf[i] = _BASE62_BYTES[rem]
+            i -= 1
+
+    return buf.decode("ascii")
 
 def decode_slug(slug: str) -> Optional[int]:
     """
@@ -54,23 +83,39 @@ def decode_slug(slug: str) -> Optional[int]:
         # Character not in BASE62 alphabet
         return None
 
-def parse_user_agent(user_agent_string: Optional[str]) -> dict:
+# Substrings found in every user agent worth running the full parser on.
+# Anything without one of these (curl, python-requests, Go-http-client, ...)
+# would come back unknown anyway, so skip the regex walk entirely; a plain
+# substring scan is far cheaper than ua-parser's pattern cascade.
+_UA_TOKENS = ("Mozilla", "Chrome", "Firefox", "Safari", "Edge", "Opera", "bot", "Bot")
+
+_UNKNOWN_UA_INFO = {
+    "device_type": "unknown",
+    "browser": "unknown",
+    "os": "unknown"
+}
+
+def _parse_user_agent_impl(user_agent_string: Optional[str]) -> dict:
     """
     Parse user agent string to extract device info.
-    
+
     Args:
         user_agent_string: User agent string from request
-        
+
     Returns:
         Dictionary with device_type, browser, and os
+
+    Note:
+        Call through parse_user_agent, which caches results per UA string.
+        The returned dict is shared between callers - read it, don't mutate it.
     """
     if not user_agent_string:
-        return {
-            "device_type": "unknown",
-            "browser": "unknown",
-            "os": "unknown"
-        }
-    
+        return _UNKNOWN_UA_INFO
+
+    # Fast path: no known browser/bot token means the full parse is wasted work
+    if not any(token in user_agent_string for token in _UA_TOKENS):
+        return _UNKNOWN_UA_INFO
+
     user_agent = parse(user_agent_string)
     
     # Determine device type
@@ -89,45 +134,82 @@ def parse_user_agent(user_agent_string: Optional[str]) -> dict:
         "os": f"{user_agent.os.family} {user_agent.os.version_string}"
     }
 
+# Real-world UA traffic is dominated by a small set of strings, so caching the
+# parse result turns the expensive ua-parser regex walk into a dict lookup on
+# almost every redirect
+parse_user_agent = functools.lru_cache(maxsize=4096)(_parse_user_agent_impl)
+
+# Process-wide cache of (table_name, value) -> row id for the dimension
+# tables; entries are immutable once created, so steady-state lookups never
+# touch the database
+_DIMENSION_ID_CACHE = {}
+
+async def get_or_create_dimension_id(db, model, name: Optional[str]) -> Optional[int]:
+    """
+    Intern a string in a small dimension table (Browser, OperatingSystem)
+    and return its row id, inserting the row on first sight.
+
+    Args:
+        db: Async database session
+        model: Dimension model class with id and unique name columns
+        name: String value to intern (None passes through as None)
+
+    Returns:
+        Row id for the value, or None if name is None
+    """
+    if name is None:
+        return None
+
+    key = (model.__tablename__, name)
+    row_id = _DIMENSION_ID_CACHE.get(key)
+    if row_id is not None:
+        return row_id
+
+    row_id = (await db.execute(select(model.id).where(model.name == name))).scalar()
+    if row_id is None:
+        try:
+            row = model(name=name)
+            db.add(row)
+            await db.commit()
+            row_id = row.id
+        except IntegrityError:
+            # Another process inserted the same value first
+            await db.rollback()
+            row_id = (await db.execute(select(model.id).where(model.name == name))).scalar()
+
+    _DIMENSION_ID_CACHE[key] = row_id
+    return row_id
+
+# Precompiled validators: the C regex engine checks the whole string in one
+# call instead of a Python-level loop per character
+_URL_RE = re.compile(r"^https?://\S{3,}\Z")
+_SLUG_RE = re.compile(r"^[A-Za-z0-9_\-]{3,50}\Z")
+
 def validate_url(url: str) -> bool:
     """
     Validate if a URL is properly formatted.
-    
+
     Args:
         url: URL string to validate
-        
+
     Returns:
         True if valid, False otherwise
     """
     if not url or len(url) > 2048:  # Max URL length
         return False
-    
-    if not url.startswith(("http://", "https://")):
-        return False
-    
-    # Basic check for valid URL structure
-    if len(url) < 10:  # http://a.b is minimum valid URL
-        return False
-    
-    return True
+
+    return _URL_RE.match(url) is not None
 
 def validate_custom_slug(slug: str) -> bool:
     """
     Validate custom slug format.
-    Only allows alphanumeric characters and hyphens.
-    
+    Only allows alphanumeric characters, hyphens, and underscores,
+    3-50 characters.
+
     Args:
         slug: Custom slug to validate
-        
+
     Returns:
         True if valid, False otherwise
     """
-    if not slug:
-        return False
-    
-    # Only allow alphanumeric and hyphens, 3-50 characters
-    if len(slug) < 3 or len(slug) > 50:
-        return False
-    
-    allowed_chars = set(string.ascii_letters + string.digits + '-_')
-    return all(char in allowed_chars for char in slug)
+    return bool(slug) and _SLUG_RE.match(slug) is not None